@@ -0,0 +1,194 @@
+import hashlib
+import mmap
+import os
+import struct
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+
+def to_display_format(image):
+    # Match the display's pixel format so blits skip per-pixel conversion.
+    # Only possible once a display mode is set; before that it's a no-op.
+    if pygame.display.get_surface() is None:
+        return image
+    if image.get_flags() & pygame.SRCALPHA:
+        return image.convert_alpha()
+    return image.convert()
+
+
+def load_image(path, size=None, cache=None, convert=True):
+    # convert=False leaves the display-format conversion to the caller, for
+    # loads that run off the main thread.
+    if cache is not None and size is not None:
+        return cache.load(path, size, convert)
+    image = pygame.image.load(path)
+    if size is not None:
+        image = pygame.transform.scale(image, size)
+    return to_display_format(image) if convert else image
+
+
+class ImageCache:
+    # Already-scaled pixels on disk, one file per (source bytes, size). A
+    # changed source hashes to a new entry, so stale files are never read.
+    # Entry layout: header (width, height, bytes per pixel) + raw pixels,
+    # mapped and wrapped with frombuffer, then copied into display format.
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHB")
+    MAGIC = b"PMIC"
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, source, size):
+        digest = hashlib.sha1(source)
+        digest.update(f"{self.VERSION}:{size[0]}x{size[1]}".encode())
+        return os.path.join(self.cache_dir, digest.hexdigest() + ".raw")
+
+    def load(self, path, size, convert=True):
+        with open(path, "rb") as f:
+            source = f.read()
+        entry = self.entry_path(source, size)
+        image = self.read(entry, size, convert)
+        if image is not None:
+            self.hits += 1
+            return image
+        self.misses += 1
+        image = pygame.transform.scale(pygame.image.load(path), size)
+        self.write(entry, image)
+        return to_display_format(image) if convert else image
+
+    def read(self, entry, size, convert=True):
+        try:
+            with open(entry, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                magic, width, height, depth = self.HEADER.unpack_from(mapped)
+                if magic != self.MAGIC or (width, height) != tuple(size) or depth not in (3, 4):
+                    return None
+                if len(mapped) != self.HEADER.size + width * height * depth:
+                    return None
+                view = memoryview(mapped)[self.HEADER.size:]
+                surface = pygame.image.frombuffer(view, (width, height), "RGBA" if depth == 4 else "RGB")
+                image = to_display_format(surface) if convert else surface
+                if image is surface:
+                    image = surface.copy()
+                del surface
+                view.release()
+                return image
+        except (OSError, ValueError, struct.error):
+            return None
+
+    def write(self, entry, image):
+        depth = 4 if image.get_flags() & pygame.SRCALPHA else 3
+        pixels = pygame.image.tobytes(image, "RGBA" if depth == 4 else "RGB")
+        temporary = f"{entry}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(temporary, "wb") as f:
+                f.write(self.HEADER.pack(self.MAGIC, image.get_width(), image.get_height(), depth))
+                f.write(pixels)
+            os.replace(temporary, entry)
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+
+def oriented(image, direction):
+    # Pac-Man sprites face right; direction codes match Pacman.direction.
+    if direction == 1:
+        return pygame.transform.flip(image, True, False)
+    elif direction == 2:
+        return pygame.transform.rotate(image, 90)
+    elif direction == 3:
+        return pygame.transform.rotate(image, -90)
+    return image
+
+
+class FontRegistry:
+    # One pygame Font per (file, size), opened the first time a screen asks
+    # for it. loads_per_second is refreshed by tick() about once a second.
+    def __init__(self, font_dir):
+        self.font_dir = font_dir
+        self.fonts = {}
+        self.loads = 0
+        self.loads_per_second = 0.0
+        self.window_start = time.perf_counter()
+        self.window_loads = 0
+
+    def get(self, filename, size):
+        key = (filename, size)
+        font = self.fonts.get(key)
+        if font is None:
+            path = None if filename is None else os.path.join(self.font_dir, filename)
+            font = pygame.font.Font(path, size)
+            self.fonts[key] = font
+            self.loads += 1
+        return font
+
+    def tick(self):
+        now = time.perf_counter()
+        elapsed = now - self.window_start
+        if elapsed >= 1.0:
+            self.loads_per_second = (self.loads - self.window_loads) / elapsed
+            self.window_start = now
+            self.window_loads = self.loads
+
+
+class TextCache:
+    # Rendered text surfaces keyed by (font, text, antialias, color), evicted
+    # least recently used first once more than maxsize are held. Callers
+    # must not draw onto the returned surfaces; copy() them first.
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, antialias, color):
+        key = (font, text, antialias, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.maxsize:
+            self.surfaces.popitem(last=False)
+        return surface
+
+
+class AssetManager:
+    # Named asset groups loaded the first time something asks for them.
+    # prefetch() runs a group's load on a worker thread ahead of time; its
+    # finish step (display-format conversion and the like) always runs on
+    # the thread that calls get(), i.e. the main loop.
+    def __init__(self):
+        self.groups = {}
+        self.loaded = {}
+        self.pending = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="assets")
+
+    def register(self, name, load, finish=None):
+        self.groups[name] = (load, finish)
+
+    def prefetch(self, name):
+        if name in self.loaded or name in self.pending:
+            return
+        load, _ = self.groups[name]
+        self.pending[name] = self.executor.submit(load)
+
+    def get(self, name):
+        if name in self.loaded:
+            return self.loaded[name]
+        load, finish = self.groups[name]
+        future = self.pending.pop(name, None)
+        value = future.result() if future is not None else load()
+        if finish is not None:
+            value = finish(value)
+        self.loaded[name] = value
+        return value
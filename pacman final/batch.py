@@ -0,0 +1,317 @@
+import numpy as np
+
+from board import boards
+from junctions import REVERSE
+from pathfinding import CompiledBoard
+from simulation import DEFAULT_DIFFICULTY, GHOST_OFFSET, GHOST_TARGET_X, GHOST_TARGET_Y, PACMAN_OFFSET, SCALE, X_GRID, Y_GRID, World
+
+
+PLAYING, GAME_OVER, VICTORY = 0, 1, 2
+BLINKY, INKY, PINKY, CLYDE = range(4)
+
+# Unit steps per direction code, as (dx, dy).
+PACMAN_STEPS = np.array([(1, 0), (-1, 0), (0, -1), (0, 1)])
+CHASE_STEPS = np.array([(-1, 0), (1, 0), (0, -1), (0, 1)])
+REVERSE_CODES = np.array(REVERSE)
+
+
+class BatchWorld:
+    # N independent rounds on one map, stored as arrays with the game index
+    # on the first axis (ghosts on the second), all advanced by one step()
+    # with the same rules as simulation.step(). Two differences: ghosts pick
+    # their next cell from the board's PathTable every time they reach a
+    # cell instead of re-pathing on a timer, and a ghost whose next cell is
+    # across a tunnel jumps straight to it.
+    def __init__(self, size, current_map=0, difficulty=DEFAULT_DIFFICULTY, board=None):
+        world = World(current_map=current_map, difficulty=difficulty)
+        grid = np.array(boards[current_map], dtype=np.int8)
+        self.size = size
+        self.current_map = current_map
+        self.board = board if board is not None else CompiledBoard(boards[current_map])
+        self.rows, self.cols = grid.shape
+        self.width = world.width
+        self.height = world.height
+        # Positions are the same fixed-point integers as World's.
+        self.target_x = np.array(GHOST_TARGET_X)
+        self.target_y = np.array(GHOST_TARGET_Y)
+
+        cells = self.rows * self.cols
+        self.tiles = grid.ravel()
+        self.walls = self.tiles >= 3
+        self.next_hop = np.frombuffer(self.board.path_table.next_hop, dtype=np.int16).reshape(cells, cells)
+        self.exits = np.zeros((cells, 4), dtype=bool)
+        for index, exits in enumerate(self.board.junctions.exits):
+            self.exits[index, list(exits)] = True
+        targets = self.board.targets
+        self.nearest = np.array([self._index(cell) for cell in targets.nearest_cell])
+        self.ahead = np.array([[self._index(cell) for cell in cells_ahead] for cells_ahead in targets.ahead_cell])
+
+        m = current_map
+        self.player_speed = world.player_speed
+        self.ghost_speed = world.ghost_speed
+        self.chase_duration = world.chase_duration
+        self.full_health = world.full_health
+        self.pacman_home = (world.pacman_home_x[m], world.pacman_home_y[m])
+        self.ghost_home_x = np.array([world.blinky_home_x[m], world.inky_home_x[m], world.pinky_home_x[m], world.clyde_home_x[m]], dtype=np.int64)
+        self.ghost_home_y = np.array([world.blinky_home_y[m], world.inky_home_y[m], world.pinky_home_y[m], world.clyde_home_y[m]], dtype=np.int64)
+        self.ghost_in_box = np.array([False, True, True, True])
+        # Dead ghosts revive in these houses; Blinky shares Pinky's.
+        self.house_x = np.array([world.pinky_home_x[m], world.inky_home_x[m], world.pinky_home_x[m], world.clyde_home_x[m]], dtype=np.int64)
+        self.house_y = np.array([world.pinky_home_y[m], world.inky_home_y[m], world.pinky_home_y[m], world.clyde_home_y[m]], dtype=np.int64)
+        self.house_cell = np.array([self._index(world.home_cell(name)) for name in ("blinky", "inky", "pinky", "clyde")])
+        self.scatter_cell = self._index((850 * SCALE // X_GRID, 80 * SCALE // Y_GRID))
+        self.start_pellets = np.where((self.tiles == 1) | (self.tiles == 2), self.tiles, 0).astype(np.int8)
+        self.start_total = int((self.tiles == 1).sum())
+
+        self.pacman_x = np.zeros(size, dtype=np.int64)
+        self.pacman_y = np.zeros(size, dtype=np.int64)
+        self.pacman_direction = np.zeros(size, dtype=np.int64)
+        self.blocked = np.zeros(size, dtype=bool)
+        self.pellets = np.zeros((size, cells), dtype=np.int8)
+        self.score = np.zeros(size, dtype=np.int64)
+        self.lives = np.zeros(size, dtype=np.int64)
+        self.total_pellets = np.zeros(size, dtype=np.int64)
+        self.dots_eaten = np.zeros(size, dtype=np.int64)
+        self.chase_mode = np.zeros(size, dtype=bool)
+        self.chase_counter = np.zeros(size, dtype=np.int64)
+        self.state = np.zeros(size, dtype=np.int8)
+        self.ticks = np.zeros(size, dtype=np.int64)
+
+        self.ghost_x = np.zeros((size, 4), dtype=np.int64)
+        self.ghost_y = np.zeros((size, 4), dtype=np.int64)
+        self.ghost_direction = np.zeros((size, 4), dtype=np.int64)
+        self.dead = np.zeros((size, 4), dtype=bool)
+        self.sober = np.zeros((size, 4), dtype=bool)
+        self.in_box = np.zeros((size, 4), dtype=bool)
+        self.revive_timer = np.zeros((size, 4), dtype=np.int64)
+        # Cell each ghost is walking to, -1 when it needs a new one.
+        self.waypoint = np.full((size, 4), -1, dtype=np.int64)
+
+        self.reset()
+
+    def _index(self, cell):
+        if cell is None:
+            return -1
+        row, col = cell
+        return row * self.cols + col
+
+    def _cell(self, x, y, offset):
+        row = np.clip((y + offset) // Y_GRID, 0, self.rows - 1)
+        col = np.clip((x + offset) // X_GRID, 0, self.cols - 1)
+        return row * self.cols + col
+
+    def reset(self, mask=None):
+        if mask is None:
+            mask = np.ones(self.size, dtype=bool)
+        self.pacman_x[mask], self.pacman_y[mask] = self.pacman_home
+        self.pacman_direction[mask] = 0
+        self.blocked[mask] = False
+        self.pellets[mask] = self.start_pellets
+        self.score[mask] = 0
+        self.lives[mask] = self.full_health
+        self.total_pellets[mask] = self.start_total
+        self.dots_eaten[mask] = 0
+        self.chase_mode[mask] = False
+        self.chase_counter[mask] = 0
+        self.state[mask] = PLAYING
+        self.ticks[mask] = 0
+        self.ghost_direction[mask] = 0
+        self.revive_timer[mask] = 0
+        self.reset_ghosts(mask)
+
+    def reset_ghosts(self, mask):
+        self.ghost_x[mask] = self.ghost_home_x
+        self.ghost_y[mask] = self.ghost_home_y
+        self.in_box[mask] = self.ghost_in_box
+        self.sober[mask] = False
+        self.dead[mask] = False
+        self.waypoint[mask] = -1
+
+    def step(self, directions=None):
+        # directions: one Pacman.direction code per game, -1 for no key.
+        live = self.state == PLAYING
+        chase = self.chase_mode.copy()
+        for ghost in range(4):
+            self._flee(ghost, live & chase & ~self.dead[:, ghost] & ~self.sober[:, ghost] & ~self.in_box[:, ghost])
+            self._walk(ghost, live & (~chase | self.dead[:, ghost]))
+            self._walk(ghost, live & ~chase & self.dead[:, ghost])
+
+        self._collide(live)
+
+        if directions is not None:
+            turning = live & (directions >= 0)
+            self.pacman_direction[turning] = directions[turning]
+            self.blocked[turning] = False
+
+        self._move_pacman(live)
+
+        counting = live & self.chase_mode
+        self.chase_counter[counting] += 1
+        over = counting & (self.chase_counter >= self.chase_duration)
+        self.chase_mode[over] = False
+        self.chase_counter[over] = 0
+        self.sober[over] = False
+
+        self.ticks[live] += 1
+        self.state[live & (self.lives <= 0)] = GAME_OVER
+        won = live & (self.score >= self.total_pellets * 10)
+        self.state[won] = VICTORY
+
+    def _move_pacman(self, live):
+        moving = live & ~self.blocked
+        step_x, step_y = PACMAN_STEPS[self.pacman_direction].T
+        new_x = self.pacman_x + step_x * self.player_speed * moving
+        new_y = self.pacman_y + step_y * self.player_speed * moving
+        row = (new_y + PACMAN_OFFSET) // Y_GRID
+        col = (new_x + PACMAN_OFFSET) // X_GRID
+        inside = (col > 0) & (col < 30)
+        hit = moving & inside & self.walls[np.clip(row, 0, self.rows - 1) * self.cols + np.clip(col, 0, self.cols - 1)]
+        self.blocked |= hit
+
+        going = moving & ~hit
+        np.copyto(self.pacman_x, new_x, where=going)
+        np.copyto(self.pacman_y, new_y, where=going)
+        self.pacman_x[going & (self.pacman_x + PACMAN_OFFSET <= 0)] = (self.width - 10 - 40) * SCALE
+        self.pacman_x[going & (self.pacman_x + PACMAN_OFFSET >= self.width * SCALE)] = (10 - 40) * SCALE
+
+        row = (self.pacman_y + PACMAN_OFFSET) // Y_GRID
+        col = (self.pacman_x + PACMAN_OFFSET) // X_GRID
+        eating = going & (row >= 0) & (row < self.rows) & (col >= 0) & (col < self.cols)
+        cell = np.clip(row, 0, self.rows - 1) * self.cols + np.clip(col, 0, self.cols - 1)
+        games = np.arange(self.size)
+        value = self.pellets[games, cell]
+        dot = eating & (value == 1)
+        power = eating & (value == 2)
+        self.score += 10 * dot + 50 * power
+        self.dots_eaten += dot
+        self.total_pellets += 5 * power
+        eaten = dot | power
+        self.pellets[games[eaten], cell[eaten]] = 0
+        self.sober[power] = False
+        self.chase_mode[power] = True
+        self.chase_counter[power] = 0
+
+    def _goals(self, ghost, games, cell):
+        pacman_cell = self._cell(self.pacman_x[games], self.pacman_y[games], PACMAN_OFFSET)
+        pacman_row, pacman_col = np.divmod(pacman_cell, self.cols)
+        row, col = np.divmod(cell, self.cols)
+        distance_sq = (col - pacman_col) ** 2 + (row - pacman_row) ** 2
+        goal = pacman_cell
+
+        if ghost == PINKY:
+            ahead = self.ahead[self.pacman_direction[games], pacman_cell]
+            goal = np.where((distance_sq <= 16) | (ahead < 0), pacman_cell, ahead)
+        elif ghost == CLYDE:
+            chasing = np.where(distance_sq <= 64, self.scatter_cell, pacman_cell)
+            goal = np.where(self.score[games] >= 600, chasing, cell)
+        elif ghost == INKY:
+            step_x, step_y = PACMAN_STEPS[self.pacman_direction[games]].T
+            ahead_row = pacman_row + 2 * step_y
+            ahead_col = pacman_col + 2 * step_x
+            blinky_row, blinky_col = np.divmod(self._cell(self.ghost_x[games, BLINKY], self.ghost_y[games, BLINKY], GHOST_OFFSET), self.cols)
+            target_row = np.clip(2 * ahead_row - blinky_row, 0, self.rows - 1)
+            target_col = np.clip(2 * ahead_col - blinky_col, 0, self.cols - 1)
+            target = self.nearest[target_row * self.cols + target_col]
+            target = np.where(target < 0, pacman_cell, target)
+            goal = np.where(self.dots_eaten[games] >= 30, target, cell)
+
+        return np.where(self.dead[games, ghost], self.house_cell[ghost], goal)
+
+    def _walk(self, ghost, mask):
+        games = np.nonzero(mask)[0]
+        if not len(games):
+            return
+        x = self.ghost_x[games, ghost]
+        y = self.ghost_y[games, ghost]
+        waypoint = self.waypoint[games, ghost]
+        picking = waypoint < 0
+        if picking.any():
+            cell = self._cell(x, y, GHOST_OFFSET)
+            goal = self._goals(ghost, games, cell)
+            hop = np.where(goal >= 0, self.next_hop[cell, np.maximum(goal, 0)], -1)
+            waypoint = np.where(picking, hop, waypoint)
+
+            # Tunnel: the next cell is on the far side of the board.
+            current_col = cell % self.cols
+            jump = picking & (hop >= 0) & (np.abs(hop % self.cols - current_col) > 1)
+            x = np.where(jump, self.target_x[hop % self.cols], x)
+            y = np.where(jump, self.target_y[hop // self.cols], y)
+            waypoint = np.where(jump, -1, waypoint)
+
+        walking = waypoint >= 0
+        self.in_box[games[walking], ghost] = False
+        target_x = self.target_x[waypoint % self.cols]
+        target_y = self.target_y[waypoint // self.cols]
+        x = np.where(walking, x + np.clip(target_x - x, -self.ghost_speed, self.ghost_speed), x)
+        y = np.where(walking, y + np.clip(target_y - y, -self.ghost_speed, self.ghost_speed), y)
+        arrived = walking & (np.abs(x - target_x) < 2 * SCALE) & (np.abs(y - target_y) < 2 * SCALE)
+        self.waypoint[games, ghost] = np.where(arrived, -1, waypoint)
+        self.ghost_x[games, ghost] = x
+        self.ghost_y[games, ghost] = y
+
+        home = self.dead[games, ghost] & (np.abs(x - self.house_x[ghost]) < 30 * SCALE) & (np.abs(y - self.house_y[ghost]) < 30 * SCALE)
+        home_games = games[home]
+        self.revive_timer[home_games, ghost] += 1
+        self.in_box[home_games, ghost] = True
+        revived = home_games[self.revive_timer[home_games, ghost] >= 30]
+        self.dead[revived, ghost] = False
+        self.sober[revived, ghost] = True
+        self.revive_timer[revived, ghost] = 0
+
+    def _flee(self, ghost, mask):
+        # Ghost.chase_move: keep going while the way ahead is open, otherwise
+        # take the open turn (never a reversal) that ends furthest from
+        # Pac-Man.
+        games = np.nonzero(mask)[0]
+        if not len(games):
+            return
+        x = self.ghost_x[games, ghost]
+        y = self.ghost_y[games, ghost]
+        direction = self.ghost_direction[games, ghost]
+        # Off-board columns in a tunnel wrap onto the same row, as in
+        # JunctionGraph.exits_at.
+        row = np.clip((y + GHOST_OFFSET) // Y_GRID, 0, self.rows - 1)
+        exits = self.exits[row * self.cols + (x + GHOST_OFFSET) // X_GRID % self.cols]
+        straight = exits[np.arange(len(games)), direction]
+
+        options = exits & (np.arange(4) != REVERSE_CODES[direction][:, None])
+        next_x = x[:, None] + CHASE_STEPS[:, 0] * X_GRID
+        next_y = y[:, None] + CHASE_STEPS[:, 1] * Y_GRID
+        distance_sq = (self.pacman_x[games, None] - next_x) ** 2 + (self.pacman_y[games, None] - next_y) ** 2
+        best = np.argmax(np.where(options, distance_sq, -1), axis=1)
+        turning = ~straight & options.any(axis=1)
+
+        direction = np.where(turning, best, direction)
+        speed = np.where(straight, self.ghost_speed - SCALE // 2, np.where(turning, self.ghost_speed, 0))
+        x = x + CHASE_STEPS[direction, 0] * speed
+        y = y + CHASE_STEPS[direction, 1] * speed
+
+        # Through the tunnel to the other side, as chase_move does.
+        col = (x + GHOST_OFFSET) // X_GRID
+        on_board = (col >= 0) & (col < self.cols)
+        tunnel = on_board & (self.tiles[row * self.cols + np.clip(col, 0, self.cols - 1)] == -1)
+        x = np.where(tunnel & (direction == 0) & (x + GHOST_OFFSET <= X_GRID // 2 + 10 * SCALE), self.width * SCALE - X_GRID - GHOST_OFFSET, x)
+        x = np.where(tunnel & (direction == 1) & (x + GHOST_OFFSET >= self.width * SCALE - X_GRID), X_GRID // 2 - GHOST_OFFSET, x)
+        self.ghost_direction[games, ghost] = direction
+        self.ghost_x[games, ghost] = x
+        self.ghost_y[games, ghost] = y
+
+    def _collide(self, live):
+        # with_ghost_collision, ghost by ghost so a caught Pac-Man is already
+        # back home when the next ghost is checked.
+        for ghost in range(4):
+            touching = (np.abs(self.pacman_x - self.ghost_x[:, ghost]) < 40 * SCALE) & (np.abs(self.pacman_y - self.ghost_y[:, ghost]) < 40 * SCALE)
+            hit = live & touching & ~self.dead[:, ghost]
+            eaten = hit & self.chase_mode
+            self.score[eaten] += 200
+            self.total_pellets[eaten] += 20
+            self.dead[eaten, ghost] = True
+            self.waypoint[eaten, ghost] = -1
+
+            caught = hit & ~self.chase_mode
+            self.lives[caught] -= 1
+            self.pacman_x[caught], self.pacman_y[caught] = self.pacman_home
+            self.state[caught & (self.lives <= 0)] = GAME_OVER
+            self.chase_mode[caught] = False
+            self.chase_counter[caught] = 0
+            self.reset_ghosts(caught)
@@ -0,0 +1,380 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+from board import boards
+from pathfinding import AStarSearch, BreadthFirstSearch, DistanceField, Maze, PathTable
+from simulation import World, step
+
+
+def compare_engines(sample_step=10):
+    # A* expands about half the nodes BFS does, but each expansion costs a
+    # heap push/pop, so on boards this size BFS still wins on wall time.
+    print(f"{'map':>4} {'queries':>8} {'bfs nodes':>10} {'a* nodes':>10} {'ratio':>6} {'bfs s':>7} {'a* s':>7} {'ratio':>6} {'faster':>7}")
+    for map_index, grid in enumerate(boards):
+        maze = Maze.from_grid(grid)
+        bfs = BreadthFirstSearch(maze)
+        astar = AStarSearch(maze)
+        table = PathTable(maze)
+        cells = [maze.cell(index) for index in range(maze.size) if maze.walkable[index]]
+        pairs = [(start, goal) for start in cells[::sample_step] for goal in cells]
+
+        started = time.perf_counter()
+        bfs_paths = [bfs.path(start, goal) for start, goal in pairs]
+        bfs_time = time.perf_counter() - started
+        started = time.perf_counter()
+        astar_paths = [astar.path(start, goal) for start, goal in pairs]
+        astar_time = time.perf_counter() - started
+        bfs_nodes, astar_nodes = bfs.expanded, astar.expanded
+
+        for (start, goal), expected, actual in zip(pairs, bfs_paths, astar_paths):
+            if len(expected) != len(actual):
+                raise AssertionError(f"map {map_index}: {start} -> {goal} bfs {len(expected)} vs a* {len(actual)}")
+
+        # Ghosts drifting out of a tunnel search from a few columns off the
+        # board; that must give the same path as the wrapped cell.
+        cols = len(grid[0])
+        tunnels = [row for row in range(len(grid)) if grid[row][0] == -1]
+        fields = {goal: DistanceField(maze, goal) for goal in cells[::sample_step]}
+        for row in tunnels:
+            for col in list(range(-4, 0)) + list(range(cols, cols + 4)):
+                for goal in cells[::sample_step]:
+                    expected = bfs.path((row, col % cols), goal)
+                    for engine, actual in (
+                        ("bfs", bfs.path((row, col), goal)),
+                        ("a*", astar.path((row, col), goal)),
+                        ("table", table.path((row, col), goal)),
+                        ("field", fields[goal].path_from((row, col))),
+                    ):
+                        if actual is None or len(actual) != len(expected):
+                            raise AssertionError(f"map {map_index}: off-board {(row, col)} -> {goal} {engine} {actual if actual is None else len(actual)} vs {len(expected)}")
+
+        node_ratio = astar_nodes / bfs_nodes if bfs_nodes else 0
+        time_ratio = astar_time / bfs_time if bfs_time else 0
+        faster = "bfs" if bfs_time <= astar_time else "a*"
+        print(f"{map_index + 1:>4} {len(pairs):>8} {bfs_nodes:>10} {astar_nodes:>10} {node_ratio:>6.2f} "
+              f"{bfs_time:>7.2f} {astar_time:>7.2f} {time_ratio:>6.2f} {faster:>7}")
+
+
+def check_exits():
+    # chase_move reads open directions from JunctionGraph.exits_at. Check
+    # it against the per-cell list lookups it replaced, on every cell and
+    # on the off-board columns a ghost passes through in a tunnel. Then walk
+    # a frightened ghost out of each tunnel end: it must stay on the tunnel
+    # row and come out on the other side, and once chase mode ends move()
+    # must keep it on the board.
+    from junctions import CHASE_STEPS
+    from simulation import GHOST_OFFSET, GHOST_TARGET_X, GHOST_TARGET_Y, SCALE, X_GRID
+
+    for map_index, grid in enumerate(boards):
+        world = World(current_map=map_index)
+        world.reset()
+        rows, cols = len(grid), len(grid[0])
+        for row in range(rows - 1):
+            for col in range(-cols + 1, cols - 1):
+                expected = tuple(
+                    direction for direction, (d_row, d_col) in enumerate(CHASE_STEPS)
+                    if grid[row + d_row][col + d_col] < 3
+                )
+                actual = world.board.junctions.exits_at(row, col)
+                if expected != actual:
+                    raise AssertionError(f"map {map_index}: ({row}, {col}) exits {actual}, expected {expected}")
+
+        tunnels = [row for row in range(rows) if grid[row][0] == -1]
+        for row in tunnels:
+            for direction, start, end in ((0, 1, cols - 1), (1, cols - 2, 0)):
+                world.reset()
+                world.chase_mode = True
+                ghost = world.ghosts[0]
+                ghost.x, ghost.y, ghost.direction = GHOST_TARGET_X[start], GHOST_TARGET_Y[row], direction
+                for _ in range(world.fps * 2):
+                    ghost.chase_move()
+                    if ghost.y != GHOST_TARGET_Y[row] or not 0 <= ghost.x + GHOST_OFFSET < world.width * SCALE:
+                        raise AssertionError(f"map {map_index}: frightened ghost left tunnel row {row} at x={ghost.x}")
+                    if (ghost.x + GHOST_OFFSET) // X_GRID == end:
+                        break
+                else:
+                    raise AssertionError(f"map {map_index}: frightened ghost never came through tunnel row {row}")
+                world.chase_mode = False
+                for _ in range(world.fps * 2):
+                    ghost.move()
+                    if not 0 <= ghost.x + GHOST_OFFSET < world.width * SCALE:
+                        raise AssertionError(f"map {map_index}: ghost off the board at x={ghost.x} after chase mode")
+        print(f"{map_index + 1:>4} exits match on {(rows - 1) * (2 * cols - 2)} cells, tunnel rows {tunnels} ok")
+
+
+def check_off_board(ticks=900):
+    # A ghost a few columns past either end of each tunnel, alive or eaten,
+    # on every path engine: alone on the board it must find its way back
+    # on, and eaten eyes must reach the house and revive.
+    from simulation import GHOST_OFFSET, GHOST_TARGET_X, GHOST_TARGET_Y, SCALE, X_GRID
+
+    print(f"{'map':>4} {'row':>4} {'engine':>7} {'col':>4} {'ghost':>6} {'ticks':>6}")
+    for map_index, grid in enumerate(boards):
+        cols = len(grid[0])
+        for row in (row for row in range(len(grid)) if grid[row][0] == -1):
+            for engine in ("table", "bfs", "astar", "graph"):
+                for col in (-4, cols + 3):
+                    for dead in (False, True):
+                        world = World(current_map=map_index, path_engine=engine)
+                        world.reset()
+                        ghost = world.ghosts[0]
+                        world.ghosts = [ghost]
+                        world.ghost_delay_counter = 0
+                        ghost.x = GHOST_TARGET_X[0] + col * X_GRID
+                        ghost.y = GHOST_TARGET_Y[row]
+                        ghost.is_dead = dead
+                        for tick in range(ticks):
+                            step(world)
+                            world.eaten.clear()
+                            on_board = 0 <= ghost.x + GHOST_OFFSET < world.width * SCALE
+                            if (dead and not ghost.is_dead) or (not dead and on_board):
+                                break
+                        else:
+                            raise AssertionError(f"map {map_index}: {engine} ghost from ({row}, {col}) stuck at x={ghost.x}")
+                        print(f"{map_index + 1:>4} {row:>4} {engine:>7} {col:>4} {'eyes' if dead else 'alive':>6} {tick + 1:>6}")
+
+
+def blit_throughput(frames=300):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from assets import load_image
+
+    pygame.display.init()
+    screen = pygame.display.set_mode((900, 950))
+    images_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+    assets = [("pacman1.png", (80, 80)), ("red.png", (60, 60)), ("dead.png", (80, 80)), ("backgrond.png", (900, 950))]
+
+    print(f"{'asset':>14} {'raw blits/s':>12} {'converted blits/s':>18} {'speedup':>8}")
+    for filename, size in assets:
+        path = os.path.join(images_folder, filename)
+        raw = pygame.transform.scale(pygame.image.load(path), size)
+        converted = load_image(path, size)
+        if filename == "backgrond.png":
+            raw.set_alpha(64)
+            converted.set_alpha(64)
+        rates = []
+        for image in (raw, converted):
+            started = time.perf_counter()
+            for _ in range(frames):
+                screen.blit(image, (0, 0))
+            rates.append(frames / (time.perf_counter() - started))
+        print(f"{filename:>14} {rates[0]:>12.0f} {rates[1]:>18.0f} {rates[1] / rates[0]:>7.1f}x")
+    pygame.quit()
+
+
+STARTUP_PROBE = """
+import time
+started = time.perf_counter()
+import pygame
+import main
+game = main.Game()
+game.draw_menu()
+pygame.display.flip()
+print(time.perf_counter() - started, game.image_cache.hits, game.image_cache.misses)
+"""
+
+
+def cold_start(runs=5):
+    # Each run is a fresh interpreter, timed from before `import pygame` to
+    # the first menu frame being flipped.
+    here = os.path.dirname(os.path.abspath(__file__))
+    cache_dir = os.path.join(here, ".asset_cache")
+    env = dict(os.environ, SDL_VIDEODRIVER=os.environ.get("SDL_VIDEODRIVER", "dummy"), PYGAME_HIDE_SUPPORT_PROMPT="1")
+
+    def probe():
+        output = subprocess.run([sys.executable, "-c", STARTUP_PROBE], cwd=here, env=env, check=True, capture_output=True, text=True).stdout
+        seconds, hits, misses = output.split()[-3:]
+        return float(seconds), int(hits), int(misses)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    cold = probe()
+    warm = [probe() for _ in range(runs)]
+    print(f"cold cache: {cold[0] * 1000:7.1f} ms to first menu frame ({cold[2]} images decoded and scaled)")
+    print(f"warm cache: {min(run[0] for run in warm) * 1000:7.1f} ms best of {runs} ({warm[-1][1]} images read from cache)")
+
+
+def font_loads(seconds=2.5):
+    # Fonts opened by each screen's first frame, then FontRegistry's rolling
+    # loads_per_second while every screen is redrawn for `seconds`. Its
+    # window is about a second, so the default covers at least one window
+    # that starts after the first frames. It should settle at 0.
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    import main as game_main
+
+    game = game_main.Game()
+    screens = [
+        ("menu", game.draw_menu), ("map_select", game.draw_map_select),
+        ("instructions", game.draw_instructions), ("difficulty", game.draw_difficulty_select),
+        ("game_over", game.draw_game_over), ("victory", game.draw_victory), ("playing", game.draw_ui),
+    ]
+    print(f"{'screen':>12} {'fonts opened':>13}")
+    for name, draw in screens:
+        loads = game.fonts.loads
+        game.screen.fill("black")
+        draw()
+        game.fonts.tick()
+        print(f"{name:>12} {game.fonts.loads - loads:>13}")
+
+    frames = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        for _, draw in screens:
+            game.screen.fill("black")
+            draw()
+            game.fonts.tick()
+            frames += 1
+    print(f"{game.fonts.loads} fonts in total; {game.fonts.loads_per_second:.1f} loads/s over the last window ({frames} frames drawn)")
+    pygame.quit()
+
+
+def tick_rate(ticks=20000, seed=1):
+    # Headless simulation speed: no display, no pygame import. A new
+    # direction every 37 ticks; the world is reset whenever a round ends.
+    import random
+
+    rng = random.Random(seed)
+    print(f"{'map':>4} {'ticks':>7} {'rounds':>7} {'ticks/s':>9}")
+    for map_index in range(len(boards)):
+        world = World(current_map=map_index)
+        world.reset()
+        rounds = 1
+        started = time.perf_counter()
+        for tick in range(ticks):
+            step(world, rng.randrange(4) if tick % 37 == 0 else None)
+            world.eaten.clear()
+            if world.state != "playing":
+                world.reset()
+                rounds += 1
+        elapsed = time.perf_counter() - started
+        print(f"{map_index + 1:>4} {ticks:>7} {rounds:>7} {ticks / elapsed:>9.0f}")
+
+
+def batch_rate(sizes=(1, 10, 100, 1000, 10000), ticks=600, seed=1):
+    # Game-ticks per second of the vectorized engine at several batch sizes,
+    # finished rounds restarted in place so every game is always live.
+    import numpy as np
+    from batch import PLAYING, BatchWorld
+    from pathfinding import CompiledBoard
+
+    rng = np.random.default_rng(seed)
+    board = CompiledBoard(boards[0])
+    print(f"{'games':>6} {'ticks':>6} {'game-ticks/s':>13}")
+    for size in sizes:
+        batch = BatchWorld(size, board=board)
+        directions = np.full(size, -1)
+        started = time.perf_counter()
+        for tick in range(ticks):
+            batch.step(rng.integers(0, 4, size) if tick % 37 == 0 else directions)
+            finished = batch.state != PLAYING
+            if finished.any():
+                batch.reset(finished)
+        elapsed = time.perf_counter() - started
+        print(f"{size:>6} {ticks:>6} {size * ticks / elapsed:>13.0f}")
+
+
+def snapshot_rate(pairs=200000, warmup=300):
+    # snapshot() + restore() pairs per second on a world partway into a
+    # round, so ghosts have paths and some pellets have been eaten.
+    world = World()
+    world.reset()
+    for tick in range(warmup):
+        step(world, tick // 40 % 4 if tick % 40 == 0 else None)
+    started = time.perf_counter()
+    for _ in range(pairs):
+        world.restore(world.snapshot())
+    elapsed = time.perf_counter() - started
+    data = world.snapshot()[0]
+    print(f"{pairs / elapsed:.0f} snapshot/restore pairs/s, {len(data)} bytes packed, {world.pellets_left()} dots left")
+
+
+def restore_replay(seed=1, snapshot_tick=51, restore_tick=400, max_ticks=60 * 60 * 10):
+    # Plays a round through Game with random keys, rolls it back from
+    # restore_tick to a snapshot taken at snapshot_tick, finishes it on a
+    # new timeline, then checks the input log replays to the same result.
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import random
+    import pygame
+    import main as game_main
+    from replay import replay
+
+    rng = random.Random(seed)
+    keys = [pygame.K_RIGHT, pygame.K_LEFT, pygame.K_UP, pygame.K_DOWN]
+    print(f"{'map':>4} {'ticks':>7} {'score':>6} {'state':>10} {'entries':>8} {'replay':>7}")
+    for map_index in range(len(boards)):
+        game = game_main.Game(seed=seed)
+        game.world.current_map = map_index
+        game.reset_game()
+        game.game_state = "playing"
+        snapshot = None
+        frame = 0
+        while game.world.state == "playing" and game.world.tick < max_ticks:
+            events = [pygame.event.Event(pygame.KEYDOWN, key=rng.choice(keys))] if frame % 37 == 0 else []
+            game.handle_playing(events)
+            frame += 1
+            if snapshot is None and game.world.tick == snapshot_tick:
+                snapshot = game.snapshot()
+            elif snapshot is not None and game.world.tick == restore_tick:
+                game.restore(snapshot)
+                restore_tick = -1
+        log = game.input_log
+        log.finish(game.world)
+        world = replay(log)
+        ok = (world.tick, world.score, world.state) == (log.ticks, log.score, log.state)
+        print(f"{map_index + 1:>4} {log.ticks:>7} {log.score:>6} {log.state:>10} {len(log.entries):>8} {'ok' if ok else 'MISMATCH':>7}")
+        if not ok:
+            raise AssertionError(f"map {map_index}: replay {world.tick} ticks, score {world.score}, {world.state}")
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pac-Man performance checks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    engines = commands.add_parser("engines", help="nodes expanded and wall time of bfs vs a* on every board")
+    engines.add_argument("--sample-step", type=int, default=10)
+    commands.add_parser("exits", help="check frightened-ghost exits against per-cell lookups, tunnels included")
+    commands.add_parser("off-board", help="check ghosts past a tunnel end, alive or eaten, get back on every engine")
+    blits = commands.add_parser("blits", help="blit throughput of raw vs display-format sprites (headless)")
+    blits.add_argument("--frames", type=int, default=300)
+    startup = commands.add_parser("startup", help="cold vs warm asset cache time to first menu frame")
+    startup.add_argument("--runs", type=int, default=5)
+    fonts = commands.add_parser("fonts", help="fonts opened per screen and FontRegistry loads/s while redrawing them (headless)")
+    fonts.add_argument("--seconds", type=float, default=2.5)
+    ticks = commands.add_parser("ticks", help="headless simulation ticks per second on every board")
+    ticks.add_argument("--ticks", type=int, default=20000)
+    batch = commands.add_parser("batch", help="vectorized batch engine game-ticks per second by batch size (needs numpy)")
+    batch.add_argument("--ticks", type=int, default=600)
+    snapshots = commands.add_parser("snapshots", help="World.snapshot() + restore() pairs per second")
+    snapshots.add_argument("--pairs", type=int, default=200000)
+    roundtrip = commands.add_parser("restore-replay", help="record a round through Game with a mid-round restore and check it replays")
+    roundtrip.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == "engines":
+        compare_engines(args.sample_step)
+    elif args.command == "exits":
+        check_exits()
+    elif args.command == "off-board":
+        check_off_board()
+    elif args.command == "blits":
+        blit_throughput(args.frames)
+    elif args.command == "startup":
+        cold_start(args.runs)
+    elif args.command == "fonts":
+        font_loads(args.seconds)
+    elif args.command == "ticks":
+        tick_rate(args.ticks)
+    elif args.command == "batch":
+        batch_rate(ticks=args.ticks)
+    elif args.command == "snapshots":
+        snapshot_rate(args.pairs)
+    elif args.command == "restore-replay":
+        restore_replay(args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+def bitset(grid, test):
+    # One bit per cell, bit index = row * cols + col.
+    bits = 0
+    cols = len(grid[0])
+    for row, line in enumerate(grid):
+        for col, cell in enumerate(line):
+            if test(cell):
+                bits |= 1 << (row * cols + col)
+    return bits
+
+
+def cells(bits, cols):
+    # (row, col) of every set bit, in row-major order.
+    while bits:
+        low = bits & -bits
+        yield divmod(low.bit_length() - 1, cols)
+        bits ^= low
+
+
+class Bitboards:
+    # A board's walls, dots and power pellets as Python int bitsets. Ints
+    # are immutable, so a world starts a round by taking dots and powers
+    # as they are, and a snapshot is just the two current values.
+    def __init__(self, grid):
+        self.rows = len(grid)
+        self.cols = len(grid[0])
+        self.walls = bitset(grid, lambda cell: cell >= 3)
+        self.dots = bitset(grid, lambda cell: cell == 1)
+        self.powers = bitset(grid, lambda cell: cell == 2)
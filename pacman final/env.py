@@ -0,0 +1,171 @@
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from board import boards
+from simulation import DEFAULT_DIFFICULTY, SCALE, World, step
+
+
+# Observation row, float32:
+#   board cells (row-major, as in board.py, pellets zeroed once eaten),
+#   Pac-Man x, y in pixels, then x, y for each ghost (blinky, inky, pinky, clyde),
+#   one is-dead flag per ghost, chase mode flag.
+CELLS = len(boards[0]) * len(boards[0][0])
+PACMAN_SLICE = slice(CELLS, CELLS + 2)
+GHOST_SLICE = slice(CELLS + 2, CELLS + 10)
+DEAD_SLICE = slice(CELLS + 10, CELLS + 14)
+CHASE_INDEX = CELLS + 14
+OBSERVATION_SIZE = CELLS + 15
+
+# Actions are Pacman.direction codes, as set by handle_playing.
+ACTIONS = 4
+
+
+class PacmanEnv:
+    # Single headless game behind a gym-style reset()/step(). The reward
+    # is the score gained this step. step() returns the same observation
+    # array every time, updated in place; copy it if you need to keep one.
+    def __init__(self, current_map=0, difficulty=DEFAULT_DIFFICULTY, max_ticks=60 * 60 * 5, observation=None):
+        self.world = World(current_map=current_map, difficulty=difficulty)
+        self.max_ticks = max_ticks
+        self.ticks = 0
+        self.observation = np.zeros(OBSERVATION_SIZE, dtype=np.float32) if observation is None else observation
+
+    def reset(self):
+        self.world.reset()
+        self.ticks = 0
+        self.observation[:CELLS] = [cell for row in self.world.grid for cell in row]
+        self.world.eaten.clear()
+        self._observe()
+        return self.observation, self.info()
+
+    def step(self, action):
+        world = self.world
+        score = world.score
+        step(world, int(action))
+        self.ticks += 1
+        # Only eaten pellets change the level, so only they are rewritten.
+        cols = len(world.grid[0])
+        for row, col in world.eaten:
+            self.observation[row * cols + col] = 0
+        world.eaten.clear()
+        self._observe()
+        terminated = world.state != "playing"
+        truncated = not terminated and self.ticks >= self.max_ticks
+        return self.observation, world.score - score, terminated, truncated, self.info()
+
+    def _observe(self):
+        world = self.world
+        observation = self.observation
+        observation[PACMAN_SLICE] = (world.pacman.x / SCALE, world.pacman.y / SCALE)
+        for i, ghost in enumerate(world.ghosts):
+            observation[GHOST_SLICE.start + 2 * i] = ghost.x / SCALE
+            observation[GHOST_SLICE.start + 2 * i + 1] = ghost.y / SCALE
+            observation[DEAD_SLICE.start + i] = ghost.is_dead
+        observation[CHASE_INDEX] = world.chase_mode
+
+    def info(self):
+        return {"score": self.world.score, "lives": self.world.lives, "pellets": self.world.pellets_left(), "ticks": self.ticks, "state": self.world.state}
+
+
+def _buffers(buffer, count):
+    # Views over one shared block: observations, actions, rewards, flags.
+    observations = np.ndarray((count, OBSERVATION_SIZE), dtype=np.float32, buffer=buffer)
+    offset = observations.nbytes
+    actions = np.ndarray(count, dtype=np.int32, buffer=buffer, offset=offset)
+    offset += actions.nbytes
+    rewards = np.ndarray(count, dtype=np.float32, buffer=buffer, offset=offset)
+    offset += rewards.nbytes
+    terminated = np.ndarray(count, dtype=np.bool_, buffer=buffer, offset=offset)
+    offset += terminated.nbytes
+    truncated = np.ndarray(count, dtype=np.bool_, buffer=buffer, offset=offset)
+    return observations, actions, rewards, terminated, truncated
+
+
+def _shared_size(count):
+    return count * (OBSERVATION_SIZE * 4 + 4 + 4 + 1 + 1)
+
+
+def _worker(conn, name, index, count, current_map, difficulty, max_ticks):
+    memory = shared_memory.SharedMemory(name=name)
+    observations, actions, rewards, terminated, truncated = _buffers(memory.buf, count)
+    env = PacmanEnv(current_map, difficulty, max_ticks, observation=observations[index])
+    try:
+        while True:
+            command = conn.recv_bytes()
+            if command == b"s":
+                _, reward, done, cut, _ = env.step(actions[index])
+                rewards[index] = reward
+                terminated[index] = done
+                truncated[index] = cut
+                if done or cut:
+                    env.reset()
+            elif command == b"r":
+                env.reset()
+            else:
+                break
+            conn.send_bytes(b"k")
+    finally:
+        del observations, actions, rewards, terminated, truncated, env
+        memory.close()
+        conn.close()
+
+
+class VectorEnv:
+    # K PacmanEnvs in worker processes. Observations, actions, rewards and
+    # done flags live in one shared memory block, and the pipes only carry
+    # one-byte commands, so nothing is pickled per step. observations is a
+    # (K, OBSERVATION_SIZE) view of that block. A worker whose game ends
+    # resets it straight away; the returned flags mark the boundary and the
+    # row already holds the next game's first observation.
+    def __init__(self, count, current_map=0, difficulty=DEFAULT_DIFFICULTY, max_ticks=60 * 60 * 5):
+        self.count = count
+        self.memory = shared_memory.SharedMemory(create=True, size=_shared_size(count))
+        self.observations, self.actions, self.rewards, self.terminated, self.truncated = _buffers(self.memory.buf, count)
+        self.connections = []
+        self.processes = []
+        for index in range(count):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_worker,
+                args=(child, self.memory.name, index, count, current_map, difficulty, max_ticks),
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def _broadcast(self, command):
+        for conn in self.connections:
+            conn.send_bytes(command)
+        for conn in self.connections:
+            conn.recv_bytes()
+
+    def reset(self):
+        self._broadcast(b"r")
+        return self.observations
+
+    def step(self, actions):
+        self.actions[:] = actions
+        self._broadcast(b"s")
+        return self.observations, self.rewards, self.terminated, self.truncated
+
+    def close(self):
+        if self.memory is None:
+            return
+        for conn in self.connections:
+            conn.send_bytes(b"c")
+        for process in self.processes:
+            process.join()
+        del self.observations, self.actions, self.rewards, self.terminated, self.truncated
+        self.memory.close()
+        self.memory.unlink()
+        self.memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,176 @@
+import heapq
+
+
+# chase_move() direction codes: 0 = left, 1 = right, 2 = up, 3 = down.
+CHASE_STEPS = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+REVERSE = [1, 0, 3, 2]
+
+
+class JunctionGraph:
+    # Corridor-contracted maze: nodes sit on intersections, dead ends and
+    # tunnel ends, edges are the corridors between them weighted by length.
+    # Corridor cells map to (edge, offset) where offset counts steps from the
+    # edge's first node.
+    def __init__(self, maze, grid):
+        self.maze = maze
+        self.nodes = []
+        self.node_of = {}
+        self.edges = []
+        self.adjacency = []
+        self.corridor = {}
+        self.exits = [self._exits(grid, index) for index in range(maze.size)]
+
+        for index in range(maze.size):
+            if maze.walkable[index] and self._is_junction(index):
+                self._add_node(index)
+        for node in range(len(self.nodes)):
+            self._trace(node)
+        # Closed loops without any junction still need one node to hang on.
+        for index in range(maze.size):
+            if maze.walkable[index] and index not in self.node_of and index not in self.corridor:
+                self._trace(self._add_node(index))
+
+    def _exits(self, grid, index):
+        # Open chase_move() directions, with the same < 3 test and the same
+        # list-index wrap at the board edges as the old per-cell checks.
+        rows, cols = len(grid), len(grid[0])
+        row, col = divmod(index, cols)
+        return tuple(
+            direction for direction, (d_row, d_col) in enumerate(CHASE_STEPS)
+            if grid[(row + d_row) % rows][(col + d_col) % cols] < 3
+        )
+
+    def _is_junction(self, index):
+        col = index % self.maze.cols
+        return len(self.maze.neighbors[index]) != 2 or col == 0 or col == self.maze.cols - 1
+
+    def _add_node(self, index):
+        self.node_of[index] = len(self.nodes)
+        self.nodes.append(index)
+        self.adjacency.append([])
+        return self.node_of[index]
+
+    def _add_edge(self, a, b, cells):
+        edge = len(self.edges)
+        self.edges.append((a, b, cells))
+        self.adjacency[a].append((edge, b))
+        if b != a:
+            self.adjacency[b].append((edge, a))
+        for offset, index in enumerate(cells[:-1], start=1):
+            self.corridor[index] = (edge, offset)
+
+    def _trace(self, node):
+        neighbors = self.maze.neighbors
+        origin = self.nodes[node]
+        for first in neighbors[origin]:
+            if first in self.corridor:
+                continue
+            if first in self.node_of:
+                if self.node_of[first] > node:
+                    self._add_edge(node, self.node_of[first], [first])
+                continue
+            cells = [first]
+            previous, current = origin, first
+            while current not in self.node_of:
+                following = neighbors[current][0] if neighbors[current][0] != previous else neighbors[current][1]
+                cells.append(following)
+                previous, current = current, following
+            self._add_edge(node, self.node_of[current], cells)
+
+    def _cells_from(self, edge, node):
+        a, b, cells = self.edges[edge]
+        if node == a:
+            return cells
+        return cells[-2::-1] + [self.nodes[a]]
+
+    def _links(self, index):
+        # (node, distance, cells walked from index to that node)
+        if index in self.node_of:
+            return [(self.node_of[index], 0, [])]
+        edge, offset = self.corridor[index]
+        a, b, cells = self.edges[edge]
+        return [
+            (a, offset, cells[offset - 2::-1] + [self.nodes[a]] if offset > 1 else [self.nodes[a]]),
+            (b, len(cells) - offset, cells[offset:]),
+        ]
+
+    def exits_at(self, row, col):
+        # A ghost drifting through a tunnel can be a column or two off the
+        # board; wrap it onto the same row, as the old list indexing did.
+        return self.exits[row * self.maze.cols + col % self.maze.cols]
+
+    def locate(self, cell):
+        # (node, distance): the nearest node to a walkable cell and how many
+        # steps away it is. Not the corridor offset, which counts from the
+        # edge's first node whichever end is nearer.
+        index = self.maze.index(cell)
+        if index < 0 or not self.maze.walkable[index]:
+            return None
+        node, distance, _ = min(self._links(index), key=lambda link: link[1])
+        return node, distance
+
+    def path(self, start, goal):
+        # Same contract as PathTable.path: cells after start up to goal, or
+        # None when start is off the walkable graph.
+        maze = self.maze
+        source, target = maze.index(start), maze.index(goal)
+        if source < 0 or not maze.walkable[source]:
+            return None
+        if source == target:
+            return []
+        if target < 0 or not maze.walkable[target]:
+            return []
+
+        best_length, best_path = None, None
+        if source in self.corridor and target in self.corridor:
+            edge, start_offset = self.corridor[source]
+            goal_edge, goal_offset = self.corridor[target]
+            if edge == goal_edge:
+                cells = self.edges[edge][2]
+                best_length = abs(goal_offset - start_offset)
+                if start_offset < goal_offset:
+                    best_path = cells[start_offset:goal_offset]
+                else:
+                    best_path = cells[start_offset - 2:goal_offset - 2:-1] if goal_offset > 1 else cells[start_offset - 2::-1]
+
+        distance = {}
+        previous = {}
+        heap = []
+        for node, length, cells in self._links(source):
+            if node not in distance or length < distance[node]:
+                distance[node] = length
+                previous[node] = (None, cells)
+                heapq.heappush(heap, (length, node))
+        while heap:
+            length, node = heapq.heappop(heap)
+            if length > distance[node]:
+                continue
+            for edge, other in self.adjacency[node]:
+                step = length + len(self.edges[edge][2])
+                if other not in distance or step < distance[other]:
+                    distance[other] = step
+                    previous[other] = (node, edge)
+                    heapq.heappush(heap, (step, other))
+
+        best_node, best_tail = None, None
+        for node, length, cells in self._links(target):
+            if node in distance and (best_length is None or distance[node] + length < best_length):
+                best_length = distance[node] + length
+                best_node = node
+                best_tail = cells[-2::-1] + [target] if cells else []
+        if best_node is None:
+            return [maze.cell(index) for index in best_path] if best_path is not None else []
+
+        segments = [best_tail]
+        node = best_node
+        while True:
+            parent, via = previous[node]
+            if parent is None:
+                segments.append(via)
+                break
+            segments.append(self._cells_from(via, parent))
+            node = parent
+        path = []
+        for segment in reversed(segments):
+            path.extend(maze.cell(index) for index in segment)
+        return path
@@ -0,0 +1,397 @@
+import heapq
+from array import array
+from collections import OrderedDict, deque
+
+from bitboards import Bitboards
+from junctions import JunctionGraph
+
+
+# Neighbor order of the original per-path BFS: up, down, left, right.
+# Ties between equally short paths depend on it.
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+def is_walkable(cell):
+    return cell < 3 or cell == 9
+
+
+class Maze:
+    # Flat view of a board: cell index = row * cols + col. Columns wrap
+    # (cols - 1 <-> 0) on every row, which is how the tunnels connect.
+    def __init__(self, cells, cols):
+        self.cols = cols
+        self.rows = len(cells) // cols
+        self.size = len(cells)
+        self.walkable = bytearray(1 if is_walkable(cell) else 0 for cell in cells)
+        self.neighbors = [self._neighbors(index) for index in range(self.size)]
+
+    @classmethod
+    def from_grid(cls, grid):
+        return cls([cell for row in grid for cell in row], len(grid[0]))
+
+    def _neighbors(self, index):
+        x, y = divmod(index, self.cols)
+        result = []
+        for dx, dy in DIRECTIONS:
+            nx, ny = x + dx, y + dy
+            if ny < 0:
+                ny = self.cols - 1
+            elif ny >= self.cols:
+                ny = 0
+            if 0 <= nx < self.rows and self.walkable[nx * self.cols + ny]:
+                result.append(nx * self.cols + ny)
+        return result
+
+    def index(self, cell):
+        # A ghost can be a few columns off the board in a tunnel; wrap it
+        # onto the same row, as the old list-indexed search did.
+        row, col = cell
+        if 0 <= row < self.rows:
+            return row * self.cols + col % self.cols
+        return -1
+
+    def cell(self, index):
+        return divmod(index, self.cols)
+
+
+class BreadthFirstSearch:
+    # Breadth-first search in DIRECTIONS order, with preallocated buffers.
+    # visited holds the search generation that last touched a cell, so
+    # nothing has to be cleared between searches.
+    def __init__(self, maze):
+        self.maze = maze
+        self.visited = array("I", [0]) * maze.size
+        self.parent = array("i", [-1]) * maze.size
+        self.queue = array("i", [0]) * maze.size
+        self.generation = 0
+        self.expanded = 0
+
+    def path(self, start, goal):
+        maze = self.maze
+        source, target = maze.index(start), maze.index(goal)
+        if source < 0:
+            return []
+        if source == target:
+            return []
+        if target < 0 or not maze.walkable[target]:
+            return []
+
+        self.generation += 1
+        generation = self.generation
+        visited = self.visited
+        parent = self.parent
+        queue = self.queue
+        neighbors = maze.neighbors
+
+        visited[source] = generation
+        queue[0] = source
+        head, tail = 0, 1
+        while head < tail:
+            index = queue[head]
+            head += 1
+            if index == target:
+                break
+            for neighbor in neighbors[index]:
+                if visited[neighbor] != generation:
+                    visited[neighbor] = generation
+                    parent[neighbor] = index
+                    queue[tail] = neighbor
+                    tail += 1
+        self.expanded += head
+
+        if visited[target] != generation:
+            return []
+        path = []
+        index = target
+        while index != source:
+            path.append(maze.cell(index))
+            index = parent[index]
+        path.reverse()
+        return path
+
+
+class AStarSearch:
+    # A* over the same maze. The heuristic is Manhattan distance with the
+    # column distance taken the short way round the tunnel wrap, so it never
+    # overestimates and paths are as short as BreadthFirstSearch ones.
+    def __init__(self, maze):
+        self.maze = maze
+        self.closed = array("I", [0]) * maze.size
+        self.seen = array("I", [0]) * maze.size
+        self.cost = array("i", [0]) * maze.size
+        self.parent = array("i", [-1]) * maze.size
+        self.generation = 0
+        self.expanded = 0
+
+    def heuristic(self, index, target):
+        cols = self.maze.cols
+        row, col = divmod(index, cols)
+        goal_row, goal_col = divmod(target, cols)
+        dc = abs(col - goal_col)
+        return abs(row - goal_row) + min(dc, cols - dc)
+
+    def path(self, start, goal):
+        maze = self.maze
+        source, target = maze.index(start), maze.index(goal)
+        if source < 0:
+            return []
+        if source == target:
+            return []
+        if target < 0 or not maze.walkable[target]:
+            return []
+
+        self.generation += 1
+        generation = self.generation
+        closed = self.closed
+        seen = self.seen
+        cost = self.cost
+        parent = self.parent
+        neighbors = maze.neighbors
+        heuristic = self.heuristic
+
+        seen[source] = generation
+        cost[source] = 0
+        order = 0
+        heap = [(heuristic(source, target), order, source)]
+        found = False
+        while heap:
+            _, _, index = heapq.heappop(heap)
+            if closed[index] == generation:
+                continue
+            closed[index] = generation
+            self.expanded += 1
+            if index == target:
+                found = True
+                break
+            step = cost[index] + 1
+            for neighbor in neighbors[index]:
+                if closed[neighbor] == generation:
+                    continue
+                if seen[neighbor] != generation or step < cost[neighbor]:
+                    seen[neighbor] = generation
+                    cost[neighbor] = step
+                    parent[neighbor] = index
+                    order += 1
+                    heapq.heappush(heap, (step + heuristic(neighbor, target), order, neighbor))
+
+        if not found:
+            return []
+        path = []
+        index = target
+        while index != source:
+            path.append(maze.cell(index))
+            index = parent[index]
+        path.reverse()
+        return path
+
+
+class PathTable:
+    # All-pairs distance / next-hop table for one board. Eating pellets never
+    # changes which cells are walkable, so this is built once per map.
+    def __init__(self, maze):
+        self.maze = maze
+        size = maze.size
+        self.distance = array("h", [-1]) * (size * size)
+        self.next_hop = array("h", [-1]) * (size * size)
+        for source in range(size):
+            if maze.walkable[source]:
+                self._flood(source)
+
+    def _flood(self, source):
+        base = source * self.maze.size
+        distance = self.distance
+        next_hop = self.next_hop
+        neighbors = self.maze.neighbors
+        distance[base + source] = 0
+        queue = deque()
+        for first in neighbors[source]:
+            if distance[base + first] < 0:
+                distance[base + first] = 1
+                next_hop[base + first] = first
+                queue.append(first)
+        while queue:
+            index = queue.popleft()
+            step = distance[base + index] + 1
+            hop = next_hop[base + index]
+            for neighbor in neighbors[index]:
+                if distance[base + neighbor] < 0:
+                    distance[base + neighbor] = step
+                    next_hop[base + neighbor] = hop
+                    queue.append(neighbor)
+
+    def dist(self, start, goal):
+        source, target = self.maze.index(start), self.maze.index(goal)
+        if source < 0 or target < 0:
+            return -1
+        return self.distance[source * self.maze.size + target]
+
+    def path(self, start, goal):
+        # Returns the cells after start up to and including goal, like
+        # BreadthFirstSearch.path().
+        # None means the table can't answer (start on a wall or off the
+        # board's rows). Columns off a tunnel end wrap like Maze.index.
+        maze = self.maze
+        source, target = maze.index(start), maze.index(goal)
+        if source < 0 or not maze.walkable[source]:
+            return None
+        if source == target:
+            return []
+        if target < 0 or self.distance[source * maze.size + target] < 0:
+            return []
+        path = []
+        while source != target:
+            source = self.next_hop[source * maze.size + target]
+            path.append(maze.cell(source))
+        return path
+
+
+class DistanceField:
+    # Distances from every cell to one root cell. Any start can then walk
+    # down the gradient to the root without running its own search.
+    def __init__(self, maze, root):
+        self.maze = maze
+        self.root = root
+        self.distance = array("h", [-1]) * maze.size
+        source = maze.index(root)
+        if source < 0 or not maze.walkable[source]:
+            return
+        distance = self.distance
+        neighbors = maze.neighbors
+        queue = array("i", [0]) * maze.size
+        distance[source] = 0
+        queue[0] = source
+        head, tail = 0, 1
+        while head < tail:
+            index = queue[head]
+            head += 1
+            step = distance[index] + 1
+            for neighbor in neighbors[index]:
+                if distance[neighbor] < 0:
+                    distance[neighbor] = step
+                    queue[tail] = neighbor
+                    tail += 1
+
+    def path_from(self, start):
+        # None means the field can't answer (start or root on a row off the
+        # grid). A start off a tunnel end walks down from the wrapped cell.
+        maze = self.maze
+        distance = self.distance
+        neighbors = maze.neighbors
+        index = maze.index(start)
+        if index < 0 or maze.index(self.root) < 0:
+            return None
+        current = distance[index]
+        if current < 0:
+            reachable = [distance[n] for n in neighbors[index] if distance[n] >= 0]
+            if not reachable:
+                return []
+            current = min(reachable) + 1
+        path = []
+        while current > 0:
+            current -= 1
+            for neighbor in neighbors[index]:
+                if distance[neighbor] == current:
+                    index = neighbor
+                    break
+            path.append(maze.cell(index))
+        return path
+
+
+class PathCache:
+    # Bounded LRU of finished paths keyed by (map, start, goal). Paths only
+    # depend on walkability, so entries stay valid until a layout changes.
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        path = self.entries.get(key)
+        if path is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return path
+
+    def put(self, key, path):
+        self.entries[key] = path
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class TargetIndex:
+    # Precomputed fallbacks for ghost targets that land on a wall or off the
+    # board. Targets count as open when the cell value is < 3 (no gate), as
+    # in Ghost.update_path.
+    AHEAD = [(0, 1), (0, -1), (-1, 0), (1, 0)]
+
+    def __init__(self, grid, steps=4):
+        self.rows = len(grid)
+        self.cols = len(grid[0])
+        self.open = [grid[row][col] < 3 for row in range(self.rows) for col in range(self.cols)]
+        self.nearest_cell = [self._ring_search(divmod(index, self.cols)) for index in range(self.rows * self.cols)]
+        self.ahead_cell = [
+            [self._probe(divmod(index, self.cols), direction, steps) for index in range(self.rows * self.cols)]
+            for direction in range(len(self.AHEAD))
+        ]
+
+    def _is_open(self, row, col):
+        return 0 <= row < self.rows and 0 <= col < self.cols and self.open[row * self.cols + col]
+
+    def _ring_search(self, cell):
+        # Same scan order as Inky's original expanding-ring search.
+        row, col = cell
+        if self.open[row * self.cols + col]:
+            return cell
+        for radius in range(1, max(self.rows, self.cols)):
+            for i in range(-radius, radius + 1):
+                for j in range(-radius, radius + 1):
+                    if (i in {-radius, radius} or j in {-radius, radius}) and self._is_open(row + i, col + j):
+                        return (row + i, col + j)
+        return None
+
+    def _probe(self, cell, direction, steps):
+        # Pinky's step-back probe: the furthest open cell up to `steps`
+        # ahead of Pac-Man, or None when even Pac-Man's own cell is closed.
+        d_row, d_col = self.AHEAD[direction]
+        for step in range(steps, -1, -1):
+            row, col = cell[0] + d_row * step, cell[1] + d_col * step
+            if self._is_open(row, col):
+                return (row, col)
+        return None
+
+    def nearest(self, row, col):
+        row = min(max(row, 0), self.rows - 1)
+        col = min(max(col, 0), self.cols - 1)
+        return self.nearest_cell[row * self.cols + col]
+
+    def ahead(self, row, col, direction):
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            return None
+        return self.ahead_cell[direction][row * self.cols + col]
+
+
+class CompiledBoard:
+    # Everything derived from a board's wall layout, built once per map.
+    def __init__(self, grid):
+        self.maze = Maze.from_grid(grid)
+        self.search = BreadthFirstSearch(self.maze)
+        self.astar = AStarSearch(self.maze)
+        self.path_table = PathTable(self.maze)
+        self.targets = TargetIndex(grid)
+        self.junctions = JunctionGraph(self.maze, grid)
+        self.bits = Bitboards(grid)
+        self.fields = {}
+
+    def field_to(self, cell):
+        # Flow fields toward fixed cells (the ghost houses) are built once
+        # and kept for the lifetime of the board.
+        if cell not in self.fields:
+            self.fields[cell] = DistanceField(self.maze, cell)
+        return self.fields[cell]
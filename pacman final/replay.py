@@ -0,0 +1,119 @@
+import argparse
+import os
+import struct
+import time
+
+from simulation import STATES, World, step
+
+
+class InputLog:
+    # Everything needed to replay one round: map, difficulty, seed and the
+    # tick of every direction change. The result is stored too so a replay
+    # can be checked against it.
+    MAGIC = b"PMRL"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHBBqIIBI")
+    ENTRY = struct.Struct("<IB")
+
+    def __init__(self, current_map, difficulty, seed):
+        self.current_map = current_map
+        self.difficulty = difficulty
+        self.seed = seed
+        self.entries = []
+        self.ticks = 0
+        self.score = 0
+        self.state = "playing"
+
+    @classmethod
+    def start(cls, world):
+        return cls(world.current_map, world.difficulty, world.seed)
+
+    def record(self, tick, direction):
+        self.entries.append((tick, direction))
+
+    def rewind(self, tick):
+        # Drops input from ticks at or after `tick`, e.g. after the world
+        # was restored to a snapshot taken at that tick.
+        self.entries = [entry for entry in self.entries if entry[0] < tick]
+
+    def finish(self, world):
+        self.ticks = world.tick
+        self.score = world.score
+        self.state = world.state
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.HEADER.pack(
+                self.MAGIC, self.VERSION, self.current_map, self.difficulty, self.seed,
+                self.ticks, self.score, STATES.index(self.state), len(self.entries),
+            ))
+            for tick, direction in self.entries:
+                f.write(self.ENTRY.pack(tick, direction))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, current_map, difficulty, seed, ticks, score, state, count = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError(f"{path}: not a version {cls.VERSION} input log")
+        log = cls(current_map, difficulty, seed)
+        log.ticks = ticks
+        log.score = score
+        log.state = STATES[state]
+        log.entries = list(cls.ENTRY.iter_unpack(data[cls.HEADER.size:cls.HEADER.size + count * cls.ENTRY.size]))
+        return log
+
+
+def replay(log, world=None):
+    # Plays the log back headless, as fast as step() goes. Pass a world to
+    # reuse its compiled boards across replays.
+    if world is None:
+        world = World(current_map=log.current_map, seed=log.seed)
+    world.current_map = log.current_map
+    world.seed = log.seed
+    world.set_difficulty(log.difficulty)
+    world.reset()
+    entries = iter(log.entries)
+    pending = next(entries, None)
+    while world.tick < log.ticks and world.state == "playing":
+        direction = None
+        if pending is not None and pending[0] == world.tick:
+            direction = pending[1]
+            pending = next(entries, None)
+        step(world, direction)
+        world.eaten.clear()
+    return world
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded input logs headless")
+    parser.add_argument("logs", nargs="+", help="log files or directories of them")
+    parser.add_argument("--repeat", type=int, default=1, help="replay each log this many times and report ticks/s")
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.logs:
+        if os.path.isdir(path):
+            paths.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".pmrl")))
+        else:
+            paths.append(path)
+
+    worlds = {}
+    mismatches = 0
+    for path in paths:
+        log = InputLog.load(path)
+        world = worlds.setdefault(log.current_map, World(current_map=log.current_map))
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            replay(log, world)
+        elapsed = time.perf_counter() - started
+        ok = (world.tick, world.score, world.state) == (log.ticks, log.score, log.state)
+        mismatches += not ok
+        print(f"{path}: {'ok' if ok else 'MISMATCH'} {world.tick} ticks, score {world.score}, {world.state} "
+              f"(recorded {log.ticks}, {log.score}, {log.state}); {world.tick * args.repeat / elapsed:.0f} ticks/s")
+    raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import csv
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+
+from board import boards
+from simulation import DIFFICULTIES, World, step
+
+
+# One finished game. victory is False for a loss and for a game cut off at
+# max_ticks.
+Record = namedtuple("Record", "map_index difficulty seed score lives ticks victory")
+
+# Per-process worlds, one per map, so each worker compiles a board once and
+# reuses it for every game on that map.
+_worlds = {}
+
+
+def play(job):
+    map_index, difficulty, seed, max_ticks, turn_every = job
+    world = _worlds.get(map_index)
+    if world is None:
+        world = _worlds[map_index] = World(current_map=map_index)
+    world.set_difficulty(difficulty)
+    world.reset()
+    rng = random.Random(seed)
+    ticks = 0
+    while world.state == "playing" and ticks < max_ticks:
+        step(world, rng.randrange(4) if ticks % turn_every == 0 else None)
+        world.eaten.clear()
+        ticks += 1
+    return Record(map_index, difficulty, seed, world.score, world.lives, ticks, world.state == "victory")
+
+
+def sweep_jobs(games, max_ticks, turn_every, first_seed=0):
+    # Every map x every difficulty x `games` seeds.
+    return [
+        (map_index, difficulty, first_seed + game, max_ticks, turn_every)
+        for map_index in range(len(boards))
+        for difficulty in range(len(DIFFICULTIES))
+        for game in range(games)
+    ]
+
+
+def run(jobs, processes=None, chunksize=None):
+    # Yields records as workers finish them, in completion order.
+    processes = processes or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(jobs) // (processes * 8))
+    if processes == 1:
+        for job in jobs:
+            yield play(job)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        yield from pool.imap_unordered(play, jobs, chunksize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play headless games for every map and difficulty across a process pool")
+    parser.add_argument("--games", type=int, default=100, help="games per map and difficulty")
+    parser.add_argument("--max-ticks", type=int, default=60 * 60 * 10)
+    parser.add_argument("--turn-every", type=int, default=37, help="ticks between random turns")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None, help="defaults to every core")
+    parser.add_argument("--chunksize", type=int, default=None)
+    parser.add_argument("--out", help="write every record to this CSV file")
+    args = parser.parse_args()
+
+    jobs = sweep_jobs(args.games, args.max_ticks, args.turn_every, args.seed)
+    totals = {}
+    writer = None
+    out = open(args.out, "w", newline="") if args.out else None
+    if out is not None:
+        writer = csv.writer(out)
+        writer.writerow(Record._fields)
+
+    started = time.perf_counter()
+    try:
+        for done, record in enumerate(run(jobs, args.processes, args.chunksize), start=1):
+            if writer is not None:
+                writer.writerow(record)
+            games, score, ticks, wins = totals.get((record.map_index, record.difficulty), (0, 0, 0, 0))
+            totals[(record.map_index, record.difficulty)] = (games + 1, score + record.score, ticks + record.ticks, wins + record.victory)
+            if done % 100 == 0:
+                print(f"{done}/{len(jobs)} games", file=sys.stderr)
+    finally:
+        if out is not None:
+            out.close()
+    elapsed = time.perf_counter() - started
+
+    print(f"{'map':>4} {'difficulty':>10} {'games':>6} {'mean score':>11} {'mean ticks':>11} {'wins':>5}")
+    for (map_index, difficulty), (games, score, ticks, wins) in sorted(totals.items()):
+        print(f"{map_index + 1:>4} {difficulty:>10} {games:>6} {score / games:>11.1f} {ticks / games:>11.1f} {wins:>5}")
+    total_ticks = sum(ticks for _, _, ticks, _ in totals.values())
+    print(f"{len(jobs)} games, {total_ticks} ticks in {elapsed:.1f} s ({total_ticks / elapsed:.0f} ticks/s, {total_ticks / 60 / 3600:.1f} h of play)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,643 @@
+import random
+import struct
+
+from board import boards
+from junctions import REVERSE
+from pathfinding import CompiledBoard, DistanceField, PathCache
+
+
+WIDTH = 900
+HEIGHT = 950
+FPS = 60
+
+# Positions and speeds are fixed-point integers in tenths of a pixel, so
+# every speed the game uses (1.3, speed - 0.5, ...) is exact and a round
+# plays out bit for bit the same on any machine. Divide by SCALE to draw.
+SCALE = 10
+X_GRID = WIDTH // 30 * SCALE
+Y_GRID = (HEIGHT - 50) // 32 * SCALE
+GHOST_OFFSET = 30 * SCALE
+PACMAN_OFFSET = 40 * SCALE
+# Ghost position (top left) that puts it on a cell's center, per col / row.
+GHOST_TARGET_X = [col * X_GRID + X_GRID // 2 - GHOST_OFFSET for col in range(30)]
+GHOST_TARGET_Y = [row * Y_GRID + Y_GRID // 2 - GHOST_OFFSET for row in range(33)]
+
+# (ghost speed, chase mode length in seconds, lives) per difficulty:
+# easy, normal, hard, impossible.
+DIFFICULTIES = [
+    (1, 10, 3),
+    (1.3, 8, 3),
+    (1.5, 6, 3),
+    (2, 4, 1),
+]
+DEFAULT_DIFFICULTY = 2
+
+STATES = ["playing", "game_over", "victory"]
+
+
+def fixed(value):
+    return round(value * SCALE)
+
+
+def scaled(values):
+    return [fixed(value) for value in values]
+
+
+class Pacman:
+    def __init__(self, world, speed=2 * SCALE):
+        self.world = world
+        self.speed = speed
+        self.direction = 0
+        self.collision_state = False
+        self.x = 0
+        self.y = 0
+        self.reset()
+
+    def reset(self):
+        self.direction = 0
+        self.collision_state = False
+        self.x = self.world.pacman_home_x[self.world.current_map]
+        self.y = self.world.pacman_home_y[self.world.current_map]
+
+    def check_collision(self, new_x, new_y):
+        row = (new_y + PACMAN_OFFSET) // Y_GRID
+        col = (new_x + PACMAN_OFFSET) // X_GRID
+        if col <= 0 or col >= 30:
+            return False
+        return self.world.board.bits.walls >> (row * self.world.board.bits.cols + col) & 1
+
+    def move(self):
+        new_x, new_y = self.x, self.y
+
+        if not self.collision_state:
+            if self.direction == 0:
+                new_x += self.speed
+            elif self.direction == 1:
+                new_x -= self.speed
+            elif self.direction == 2:
+                new_y -= self.speed
+            elif self.direction == 3:
+                new_y += self.speed
+
+            if self.check_collision(new_x, new_y):
+                self.collision_state = True
+            else:
+                self.x, self.y = new_x, new_y
+                row = (self.y + PACMAN_OFFSET) // Y_GRID
+                col = (self.x + PACMAN_OFFSET) // X_GRID
+
+                if self.x + PACMAN_OFFSET <= 0:
+                    self.x = (self.world.width - 10 - 40) * SCALE
+                    col = (self.x + PACMAN_OFFSET) // X_GRID
+                    for ghost in self.world.ghosts:
+                        ghost.bfs_counter = ghost.bfs_interval
+                        ghost.move()
+                elif self.x + PACMAN_OFFSET >= self.world.width * SCALE:
+                    self.x = (10 - 40) * SCALE
+                    col = (self.x + PACMAN_OFFSET) // X_GRID
+                    for ghost in self.world.ghosts:
+                        ghost.bfs_counter = ghost.bfs_interval
+                        ghost.move()
+
+                if 0 <= row < len(self.world.grid) and 0 <= col < len(self.world.grid[0]):
+                    bit = 1 << (row * len(self.world.grid[0]) + col)
+                    if self.world.dots & bit:
+                        self.world.score += 10
+                        self.world.dots ^= bit
+                        self.world.eaten.append((row, col))
+                        self.world.dots_eaten_tracker += 1
+                    elif self.world.powers & bit:
+                        self.world.score += 50
+                        self.world.powers ^= bit
+                        self.world.eaten.append((row, col))
+                        for ghost in self.world.ghosts:
+                            ghost.sober = False
+                        self.world.chase_mode = True
+                        self.world.chase_counter = 0
+
+
+class Ghost:
+    def __init__(self, world, x, y, speed, in_box=True, name="ghost"):
+        self.world = world
+        self.x = x
+        self.y = y
+        self.speed = speed
+        self.direction = 0
+        self.in_box = in_box
+        self.name = name
+        self.path = []
+        self.path_index = 0
+        self.bfs_interval = 10
+        self.bfs_counter = 0
+        self.is_dead = False
+        self.sober = False
+        self.cooldown_timer = 20
+        self.teleport_cooldown_timer = 30
+        self.revive_timer = 0
+
+    def _grid_pos(self):
+        row = (self.y + GHOST_OFFSET) // Y_GRID
+        col = (self.x + GHOST_OFFSET) // X_GRID
+        return row, col
+
+    def is_frightened(self):
+        return self.world.chase_mode and not self.is_dead and not self.sober and not self.in_box
+
+    def update_path(self):
+        row, col = self._grid_pos()
+        pacman_row = (self.world.pacman.y + PACMAN_OFFSET) // Y_GRID
+        pacman_col = (self.world.pacman.x + PACMAN_OFFSET) // X_GRID
+
+        if self.name == "blinky":
+            if self.is_dead:
+                self.path = self.world.path_home(self.name, (row, col))
+            else:
+                self.path = self.world.path_to_pacman((row, col))
+                self.world.blinky_x = self.x
+                self.world.blinky_y = self.y
+
+        elif self.name == "pinky":
+            if self.is_dead:
+                self.path = self.world.path_home(self.name, (row, col))
+            else:
+                target_pacman_row = (self.world.pacman.y + PACMAN_OFFSET) // Y_GRID
+                target_pacman_col = (self.world.pacman.x + PACMAN_OFFSET) // X_GRID
+
+                if self.cooldown_timer < self.world.chase_switch_timer:
+                    pass
+                elif (col - target_pacman_col) ** 2 + (row - target_pacman_row) ** 2 <= 16:
+                    self.cooldown_timer = 0
+                    self.path = self.world.path_to_pacman((row, col))
+                else:
+                    self.cooldown_timer = 0
+                    target = self.world.board.targets.ahead(target_pacman_row, target_pacman_col, self.world.pacman.direction)
+                    if target is not None:
+                        self.path = self.world.find_path((row, col), target)
+                    else:
+                        self.path = self.world.path_to_pacman((row, col))
+
+        elif self.name == "clyde":
+            if self.is_dead:
+                self.path = self.world.path_home(self.name, (row, col))
+            else:
+                if self.world.score >= 600:
+                    if self.cooldown_timer < self.world.chase_switch_timer:
+                        pass
+                    elif (col - pacman_col) ** 2 + (row - pacman_row) ** 2 <= 64:
+                        self.path = self.world.find_path((row, col), (850 * SCALE // X_GRID, 80 * SCALE // Y_GRID))
+                    else:
+                        self.path = self.world.path_to_pacman((row, col))
+
+        elif self.name == "inky":
+            if self.is_dead:
+                self.path = self.world.path_home(self.name, (row, col))
+            else:
+                if self.world.dots_eaten_tracker >= 30:
+                    blinky_row = (self.world.blinky_y + GHOST_OFFSET) // Y_GRID
+                    blinky_col = (self.world.blinky_x + GHOST_OFFSET) // X_GRID
+                    pacman_ahead_row, pacman_ahead_col = pacman_row, pacman_col
+
+                    if self.world.pacman.direction == 0:
+                        pacman_ahead_col += 2
+                    elif self.world.pacman.direction == 1:
+                        pacman_ahead_col -= 2
+                    elif self.world.pacman.direction == 2:
+                        pacman_ahead_row -= 2
+                    elif self.world.pacman.direction == 3:
+                        pacman_ahead_row += 2
+
+                    target_row = pacman_ahead_row + (pacman_ahead_row - blinky_row)
+                    target_col = pacman_ahead_col + (pacman_ahead_col - blinky_col)
+
+                    target = self.world.board.targets.nearest(target_row, target_col)
+                    if target is not None:
+                        self.path = self.world.find_path((row, col), target)
+                    else:
+                        self.path = self.world.path_to_pacman((row, col))
+
+        self.path_index = 0
+
+    def move(self):
+        self.bfs_counter += 1
+        if self.bfs_counter >= self.bfs_interval:
+            self.update_path()
+            self.bfs_counter = 0
+
+        if self.path:
+            if self.path_index < len(self.path):
+                self.in_box = False
+                target_row, target_col = self.path[self.path_index]
+                target_x = GHOST_TARGET_X[target_col]
+                target_y = GHOST_TARGET_Y[target_row]
+
+                dx = target_x - self.x
+                dy = target_y - self.y
+
+                move_x = min(abs(dx), self.speed) * (1 if dx > 0 else -1 if dx < 0 else 0)
+                move_y = min(abs(dy), self.speed) * (1 if dy > 0 else -1 if dy < 0 else 0)
+
+                self.x += move_x
+                self.y += move_y
+
+                row = (self.y + GHOST_OFFSET) // Y_GRID
+                col = (self.x + GHOST_OFFSET) // X_GRID
+
+                # A ghost already off the board (e.g. restored from an old
+                # snapshot) is put back on it a board's width over.
+                if col < 0:
+                    self.x += self.world.width * SCALE
+                    self.teleport_cooldown_timer = 0
+                elif col >= len(self.world.grid[0]):
+                    self.x -= self.world.width * SCALE
+                    self.teleport_cooldown_timer = 0
+                elif self.world.grid[row][col] == -1 and self.teleport_cooldown_timer >= 30:
+                    if self.x + GHOST_OFFSET <= X_GRID // 2 + 10 * SCALE:
+                        self.x = self.world.width * SCALE - X_GRID - GHOST_OFFSET
+                        self.teleport_cooldown_timer = 0
+                    elif self.x + GHOST_OFFSET >= self.world.width * SCALE - X_GRID:
+                        self.x = X_GRID // 2 - GHOST_OFFSET
+                        self.teleport_cooldown_timer = 0
+
+                if abs(self.x - target_x) < 2 * SCALE and abs(self.y - target_y) < 2 * SCALE:
+                    self.path_index += 1
+            else:
+                self.path = []
+                self.path_index = 0
+        if self.is_dead:
+            if self.name == "blinky":
+                house_x = self.world.pinky_home_x[self.world.current_map]
+                house_y = self.world.pinky_home_y[self.world.current_map]
+            elif self.name == "pinky":
+                house_x = self.world.pinky_home_x[self.world.current_map]
+                house_y = self.world.pinky_home_y[self.world.current_map]
+            elif self.name == "clyde":
+                house_x = self.world.clyde_home_x[self.world.current_map]
+                house_y = self.world.clyde_home_y[self.world.current_map]
+            elif self.name == "inky":
+                house_x = self.world.inky_home_x[self.world.current_map]
+                house_y = self.world.inky_home_y[self.world.current_map]
+            if abs(self.x - house_x) < 30 * SCALE and abs(self.y - house_y) < 30 * SCALE:
+                self.revive_timer += 1
+                self.in_box = True
+                if self.revive_timer >= 30:
+                    self.is_dead = False
+                    self.sober = True
+                    self.revive_timer = 0
+
+    def chase_move(self):
+        row = (self.y + GHOST_OFFSET) // Y_GRID
+        col = (self.x + GHOST_OFFSET) // X_GRID
+
+        if self.is_frightened():
+            exits = self.world.board.junctions.exits_at(row, col)
+
+            if self.direction in exits:
+                if self.direction == 0:
+                    self.x -= self.speed - SCALE // 2
+                elif self.direction == 1:
+                    self.x += self.speed - SCALE // 2
+                elif self.direction == 2:
+                    self.y -= self.speed - SCALE // 2
+                elif self.direction == 3:
+                    self.y += self.speed - SCALE // 2
+            else:
+                possible_moves = [direction for direction in exits if direction != REVERSE[self.direction]]
+
+                if possible_moves:
+                    best_direction = -1
+                    max_distance_sq = -1
+
+                    for direction in possible_moves:
+                        next_x, next_y = self.x, self.y
+                        if direction == 0:
+                            next_x -= X_GRID
+                        elif direction == 1:
+                            next_x += X_GRID
+                        elif direction == 2:
+                            next_y -= Y_GRID
+                        elif direction == 3:
+                            next_y += Y_GRID
+
+                        distance_sq = (self.world.pacman.x - next_x) ** 2 + (self.world.pacman.y - next_y) ** 2
+                        if distance_sq > max_distance_sq:
+                            max_distance_sq = distance_sq
+                            best_direction = direction
+
+                    if best_direction != -1:
+                        self.direction = best_direction
+                        if self.direction == 0:
+                            self.x -= self.speed
+                        elif self.direction == 1:
+                            self.x += self.speed
+                        elif self.direction == 2:
+                            self.y -= self.speed
+                        elif self.direction == 3:
+                            self.y += self.speed
+
+            # Take the tunnel the way move() does instead of walking on off
+            # the board.
+            col = (self.x + GHOST_OFFSET) // X_GRID
+            if 0 <= col < len(self.world.grid[0]) and self.world.grid[row][col] == -1:
+                if self.direction == 0 and self.x + GHOST_OFFSET <= X_GRID // 2 + 10 * SCALE:
+                    self.x = self.world.width * SCALE - X_GRID - GHOST_OFFSET
+                    self.teleport_cooldown_timer = 0
+                elif self.direction == 1 and self.x + GHOST_OFFSET >= self.world.width * SCALE - X_GRID:
+                    self.x = X_GRID // 2 - GHOST_OFFSET
+                    self.teleport_cooldown_timer = 0
+
+    def reset_ghost(self):
+        self.sober = False
+        if self.name == "blinky":
+            self.x = self.world.blinky_home_x[self.world.current_map]
+            self.y = self.world.blinky_home_y[self.world.current_map]
+        elif self.name == "inky":
+            self.x = self.world.inky_home_x[self.world.current_map]
+            self.y = self.world.inky_home_y[self.world.current_map]
+            self.in_box = True
+        elif self.name == "pinky":
+            self.x = self.world.pinky_home_x[self.world.current_map]
+            self.y = self.world.pinky_home_y[self.world.current_map]
+            self.in_box = True
+        elif self.name == "clyde":
+            self.x = self.world.clyde_home_x[self.world.current_map]
+            self.y = self.world.clyde_home_y[self.world.current_map]
+            self.in_box = True
+
+        if self.is_dead:
+            self.is_dead = False
+
+
+class World:
+    # Everything a round of play needs, with no pygame dependency. Game draws
+    # it; bots and soak tests can drive step() directly.
+
+    # snapshot() layout: world scalars, Pac-Man, then the four ghosts.
+    SNAPSHOT = struct.Struct("<Bii?iiiiiBiI" + "iiB?" + "iiB?iii??iii" * 4)
+
+    def __init__(self, current_map=0, difficulty=DEFAULT_DIFFICULTY, path_engine="table", seed=0):
+        self.width = WIDTH
+        self.height = HEIGHT
+        self.fps = FPS
+
+        self.current_map = current_map
+        # The board as loaded; never written. Pellets left are in the
+        # dots and powers bitsets (see bitboards.py).
+        self.grid = boards[self.current_map]
+        self.dots = 0
+        self.powers = 0
+        self.compiled_boards = {}
+        self.board = None
+        self.pacman_field = None
+        self.path_cache = PathCache()
+        self.path_engine = path_engine
+        # All randomness in the rules must come from rng, which reset()
+        # reseeds, so a seed plus the inputs reproduce a round exactly.
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.tick = 0
+
+        self.pacman_home_x = scaled([420, 420, 500])
+        self.pacman_home_y = scaled([650, 470, 320])
+
+        self.blinky_home_x = scaled([420, 420, 320])
+        self.blinky_home_y = scaled([320, 385, 320])
+
+        self.pinky_home_x = scaled([480, 420, 480])
+        self.pinky_home_y = scaled([400, 305, 400])
+
+        self.inky_home_x = scaled([420, 500, 420])
+        self.inky_home_y = scaled([400, 570, 400])
+
+        self.clyde_home_x = scaled([360, 360, 360])
+        self.clyde_home_y = scaled([400, 570, 400])
+
+        self.player_speed = fixed(2)
+        self.chase_mode = False
+        self.chase_counter = 0
+        self.chase_switch_timer = 20
+        self.set_difficulty(difficulty)
+
+        self.state = "playing"
+        self.score = 0
+        self.lives = self.full_health
+        self.final_score = 0
+        self.pacman = Pacman(self, speed=self.player_speed)
+        self.blinky_x = self.blinky_home_x[self.current_map]
+        self.blinky_y = self.blinky_home_y[self.current_map]
+
+        self.ghosts = []
+        self.ghost_delay_counter = 60
+        self.dots_eaten_tracker = 0
+        # Pellet cells eaten since the renderer last looked.
+        self.eaten = []
+
+    def set_difficulty(self, difficulty):
+        # Takes effect from the next reset(), like the menu always has.
+        self.difficulty = difficulty
+        ghost_speed, chase_seconds, self.full_health = DIFFICULTIES[difficulty]
+        self.ghost_speed = fixed(ghost_speed)
+        self.chase_duration = chase_seconds * self.fps
+
+    def init_ghosts(self):
+        self.ghosts = []
+        self.ghosts.append(Ghost(self, self.blinky_home_x[self.current_map], self.blinky_home_y[self.current_map], self.ghost_speed, in_box=False, name="blinky"))
+        self.ghosts.append(Ghost(self, self.inky_home_x[self.current_map], self.inky_home_y[self.current_map], self.ghost_speed, in_box=True, name="inky"))
+        self.ghosts.append(Ghost(self, self.pinky_home_x[self.current_map], self.pinky_home_y[self.current_map], self.ghost_speed, in_box=True, name="pinky"))
+        self.ghosts.append(Ghost(self, self.clyde_home_x[self.current_map], self.clyde_home_y[self.current_map], self.ghost_speed, in_box=True, name="clyde"))
+
+    def reset(self):
+        self.state = "playing"
+        self.tick = 0
+        self.rng.seed(self.seed)
+        self.score = 0
+        self.lives = self.full_health
+        self.pacman.reset()
+        self.chase_mode = False
+        self.chase_counter = 0
+        self.ghost_delay_counter = 60
+        self.blinky_x = self.blinky_home_x[self.current_map]
+        self.blinky_y = self.blinky_home_y[self.current_map]
+        self.dots_eaten_tracker = 0
+        self.eaten = []
+        self.grid = boards[self.current_map]
+        if self.current_map not in self.compiled_boards:
+            self.compiled_boards[self.current_map] = CompiledBoard(boards[self.current_map])
+            self.path_cache.clear()
+        self.board = self.compiled_boards[self.current_map]
+        self.pacman_field = None
+        for name in ("pinky", "clyde", "inky"):
+            self.board.field_to(self.home_cell(name))
+        self.dots = self.board.bits.dots
+        self.powers = self.board.bits.powers
+        self.init_ghosts()
+        for ghost in self.ghosts:
+            ghost.reset_ghost()
+
+    def pellets_left(self):
+        return self.dots.bit_count()
+
+    def power_pellets_left(self):
+        return self.powers.bit_count()
+
+    def snapshot(self):
+        # (packed scalars, dots, powers, ghost paths). Paths are kept by
+        # reference, as they are never changed in place.
+        values = [
+            self.current_map, self.score, self.lives, self.chase_mode, self.chase_counter,
+            self.dots_eaten_tracker, self.ghost_delay_counter,
+            self.blinky_x, self.blinky_y, STATES.index(self.state), self.final_score, self.tick,
+            self.pacman.x, self.pacman.y, self.pacman.direction, self.pacman.collision_state,
+        ]
+        for ghost in self.ghosts:
+            values += (
+                ghost.x, ghost.y, ghost.direction, ghost.in_box, ghost.path_index,
+                ghost.bfs_interval, ghost.bfs_counter, ghost.is_dead, ghost.sober,
+                ghost.cooldown_timer, ghost.teleport_cooldown_timer, ghost.revive_timer,
+            )
+        return self.SNAPSHOT.pack(*values), self.dots, self.powers, tuple(ghost.path for ghost in self.ghosts)
+
+    def restore(self, snapshot):
+        # Restores a snapshot taken from a reset world; rng state is not
+        # part of it, as nothing in the rules draws from rng.
+        data, self.dots, self.powers, paths = snapshot
+        values = self.SNAPSHOT.unpack(data)
+        (self.current_map, self.score, self.lives, self.chase_mode, self.chase_counter,
+         self.dots_eaten_tracker, self.ghost_delay_counter,
+         self.blinky_x, self.blinky_y, state, self.final_score, self.tick) = values[:12]
+        self.state = STATES[state]
+        pacman = self.pacman
+        pacman.x, pacman.y, pacman.direction, pacman.collision_state = values[12:16]
+        start = 16
+        for ghost, path in zip(self.ghosts, paths):
+            (ghost.x, ghost.y, ghost.direction, ghost.in_box, ghost.path_index,
+             ghost.bfs_interval, ghost.bfs_counter, ghost.is_dead, ghost.sober,
+             ghost.cooldown_timer, ghost.teleport_cooldown_timer, ghost.revive_timer) = values[start:start + 12]
+            ghost.path = path
+            start += 12
+        self.grid = boards[self.current_map]
+        self.board = self.compiled_boards[self.current_map]
+        self.eaten = []
+
+    def with_ghost_collision(self):
+        for ghost in self.ghosts:
+            if abs(self.pacman.x - ghost.x) < 40 * SCALE and abs(self.pacman.y - ghost.y) < 40 * SCALE:
+                if self.chase_mode and not ghost.is_dead:
+                    self.score += 200
+                    ghost.is_dead = True
+                    ghost.update_path()
+                elif not self.chase_mode and not ghost.is_dead:
+                    self.lives -= 1
+                    self.pacman.x, self.pacman.y = self.pacman_home_x[self.current_map], self.pacman_home_y[self.current_map]
+
+                    if self.lives <= 0:
+                        self.state = "game_over"
+                    for ghost_reset in self.ghosts:
+                        self.chase_mode = False
+                        self.chase_counter = 0
+                        self.ghost_delay_counter = 60
+                        self.blinky_x = self.blinky_home_x[self.current_map]
+                        self.blinky_y = self.blinky_home_y[self.current_map]
+                        ghost_reset.reset_ghost()
+                        ghost_reset.sober = False
+
+    def find_path(self, start, goal):
+        key = (self.current_map, start, goal)
+        path = self.path_cache.get(key)
+        if path is not None:
+            return path
+        if self.path_engine == "table":
+            path = self.board.path_table.path(start, goal)
+            if path is None:
+                path = self.board.search.path(start, goal)
+        elif self.path_engine == "astar":
+            path = self.board.astar.path(start, goal)
+        elif self.path_engine == "graph":
+            path = self.board.junctions.path(start, goal)
+            if path is None:
+                path = self.board.search.path(start, goal)
+        else:
+            path = self.board.search.path(start, goal)
+        self.path_cache.put(key, path)
+        return path
+
+    def locate_on_graph(self, x, y):
+        # (nearest junction-graph node, distance to it in steps) for a ghost
+        # position, or None off the walkable cells.
+        return self.board.junctions.locate(((y + GHOST_OFFSET) // Y_GRID, (x + GHOST_OFFSET) // X_GRID))
+
+    def home_cell(self, name):
+        if name == "clyde":
+            house_x, house_y = self.clyde_home_x[self.current_map], self.clyde_home_y[self.current_map]
+        elif name == "inky":
+            house_x, house_y = self.inky_home_x[self.current_map], self.inky_home_y[self.current_map]
+        else:
+            house_x, house_y = self.pinky_home_x[self.current_map], self.pinky_home_y[self.current_map]
+        return ((house_y + GHOST_OFFSET) // Y_GRID, (house_x + GHOST_OFFSET) // X_GRID)
+
+    def path_home(self, name, start):
+        # Eyes off a tunnel end follow the field from the wrapped cell (see
+        # Maze.index); find_path is only for starts on a row off the grid.
+        home = self.home_cell(name)
+        path = self.board.field_to(home).path_from(start)
+        if path is None:
+            path = self.find_path(start, home)
+        return path
+
+    def path_to_pacman(self, start):
+        pacman_cell = ((self.pacman.y + PACMAN_OFFSET) // Y_GRID, (self.pacman.x + PACMAN_OFFSET) // X_GRID)
+        if self.pacman_field is None or self.pacman_field.root != pacman_cell:
+            self.pacman_field = DistanceField(self.board.maze, pacman_cell)
+        path = self.pacman_field.path_from(start)
+        if path is None:
+            path = self.find_path(start, pacman_cell)
+        return path
+
+
+def step(world, direction=None):
+    # Advances one frame. direction is the last arrow key pressed this frame
+    # (Pacman.direction codes) or None. Same update order the game loop has
+    # always used; dead ghosts get their extra move() here instead of from
+    # the draw call.
+    for ghost in world.ghosts:
+        ghost.cooldown_timer += 1
+        if world.pacman.collision_state:
+            ghost.bfs_interval = 30
+        else:
+            ghost.bfs_interval = 10
+            world.ghost_delay_counter -= 1
+            if ghost.teleport_cooldown_timer < 30:
+                ghost.teleport_cooldown_timer += 1
+            if not world.ghost_delay_counter:
+                ghost.update_path()
+        if world.chase_mode:
+            ghost.chase_move()
+        else:
+            ghost.move()
+        if ghost.is_dead:
+            ghost.move()
+
+    world.with_ghost_collision()
+
+    if direction is not None:
+        world.pacman.direction = direction
+        world.pacman.collision_state = False
+
+    world.pacman.move()
+
+    if world.chase_mode:
+        world.chase_counter += 1
+        if world.chase_counter >= world.chase_duration:
+            world.chase_mode = False
+            world.chase_counter = 0
+            for ghost in world.ghosts:
+                ghost.sober = False
+
+    if world.lives <= 0:
+        world.state = "game_over"
+
+    if not world.dots:
+        world.state = "victory"
+        world.final_score = world.score
+
+    world.tick += 1
+    return world